@@ -5,7 +5,9 @@ Instead of calling the live APIs, it reads sample JSON files from data/raw_mock/
 and returns them as if they were fetched from the API.
 """
 
-import json
+import os
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any
@@ -13,6 +15,9 @@ from typing import Dict, Any
 RAW_DIR = Path(__file__).resolve().parent / "data" / "raw_mock"
 RAW_DIR.mkdir(parents=True, exist_ok=True)
 
+# Pretty-print raw files only when debugging (indent roughly doubles bytes written)
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
+
 # Sample file paths
 DELIVERIES_FILE = RAW_DIR / "deliveries_sample.json"
 TRAFFIC_FILE = RAW_DIR / "traffic_sample.json"
@@ -25,8 +30,11 @@ def _now_ts() -> str:
 def _save_raw(payload: Any, api_name: str) -> str:
     ts = _now_ts()
     path = RAW_DIR / f"{api_name}_raw_{ts}.json"
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    option = orjson.OPT_NON_STR_KEYS
+    if DEBUG:
+        option |= orjson.OPT_INDENT_2
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(payload, option=option))
     return str(path.resolve())
 
 
@@ -35,8 +43,8 @@ def fetch_deliveries_live() -> Dict[str, str]:
     try:
         # If sample exists, read it; otherwise, create sample data
         if DELIVERIES_FILE.exists():
-            with open(DELIVERIES_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(DELIVERIES_FILE, "rb") as f:
+                data = orjson.loads(f.read())
         else:
             # Sample data
             data = [
@@ -72,8 +80,8 @@ def fetch_traffic_routes() -> Dict[str, str]:
     """Mock fetching traffic routes"""
     try:
         if TRAFFIC_FILE.exists():
-            with open(TRAFFIC_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(TRAFFIC_FILE, "rb") as f:
+                data = orjson.loads(f.read())
         else:
             # Sample traffic data
             data = [
@@ -98,9 +106,11 @@ def fetch_traffic_routes() -> Dict[str, str]:
 
 
 def fetch_all_raw() -> Dict[str, Dict[str, str]]:
-    results = {}
-    results["deliveries"] = fetch_deliveries_live()
-    results["traffic"] = fetch_traffic_routes()
+    # Independent fetch + disk write per source → overlap them
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        deliveries = executor.submit(fetch_deliveries_live)
+        traffic = executor.submit(fetch_traffic_routes)
+        results = {"deliveries": deliveries.result(), "traffic": traffic.result()}
     return results
 
 
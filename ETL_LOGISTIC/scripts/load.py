@@ -1,8 +1,15 @@
 import os
+import time
+import httpx
 import pandas as pd
 from supabase import create_client
 from dotenv import load_dotenv
 
+try:
+    from supabase import ClientOptions
+except ImportError:  # early supabase-py 2.x only exposes it under lib/
+    from supabase.lib.client_options import ClientOptions
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -11,35 +18,78 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("Supabase credentials missing. Set SUPABASE_URL and SUPABASE_KEY in .env")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# One keep-alive pool shared by every batch insert.
+# HTTP/2 needs h2 (pip install "httpx[http2]"); without it keep an HTTP/1.1 pool.
+POOL_LIMITS = httpx.Limits(max_keepalive_connections=16, max_connections=32)
+try:
+    http_client = httpx.Client(limits=POOL_LIMITS, http2=True)
+except ImportError:
+    http_client = httpx.Client(limits=POOL_LIMITS)
+
+# ClientOptions(httpx_client=...) needs supabase-py >= 2.16; older installs use the default client
+try:
+    options = ClientOptions(httpx_client=http_client)
+except TypeError:
+    options = ClientOptions()
+supabase = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+
+# Paths to transformed Parquet files
+DELIVERIES_PARQUET = "data/staged/deliveries_transformed_mock.parquet"
+TRAFFIC_PARQUET = "data/staged/traffic_routes_transformed_mock.parquet"
 
-# Paths to transformed CSVs
-DELIVERIES_CSV = "data/staged/deliveries_transformed_mock.csv"
-TRAFFIC_CSV = "data/staged/traffic_routes_transformed_mock.csv"
+BATCH_SIZE = 500
 
 # --- Helper to clean invalid floats ---
 def clean_df(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.fillna(0)  # Replace NaN
-    df = df.replace([float("inf"), float("-inf")], 0)  # Replace Inf
+    df = df.replace([float("inf"), float("-inf")], float("nan"))  # Inf → NaN
+    for col in df.select_dtypes(include=["datetime64"]).columns:
+        df[col] = df[col].dt.strftime("%Y-%m-%dT%H:%M:%S")  # Timestamp → ISO string
+    df = df.astype(object).where(pd.notnull(df), None)  # NaN → None (NULL in Postgres)
     return df
 
-# --- Load deliveries ---
-if os.path.exists(DELIVERIES_CSV):
-    deliveries_df = pd.read_csv(DELIVERIES_CSV)
-    deliveries_df = clean_df(deliveries_df)
-    # Insert into Supabase table
-    for _, row in deliveries_df.iterrows():
-        supabase.table("deliveries").insert(row.to_dict()).execute()
-    print("✅ Deliveries loaded.")
-else:
-    print(f"❌ CSV not found: {DELIVERIES_CSV}, skipping deliveries")
-
-# --- Load traffic routes ---
-if os.path.exists(TRAFFIC_CSV):
-    traffic_df = pd.read_csv(TRAFFIC_CSV)
-    traffic_df = clean_df(traffic_df)
-    for _, row in traffic_df.iterrows():
-        supabase.table("traffic_routes").insert(row.to_dict()).execute()
-    print("✅ Traffic routes loaded.")
-else:
-    print(f"❌ CSV not found: {TRAFFIC_CSV}, skipping traffic_routes")
+# --- Batch generator ---
+def chunk_data(data, size=BATCH_SIZE):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+# --- Batched insert with retry ---
+def insert_batches(df: pd.DataFrame, table: str) -> int:
+    records = df.to_dict("records")
+    success_count = 0
+
+    for i, batch in enumerate(chunk_data(records), start=1):
+        for attempt in range(3):
+            try:
+                response = supabase.table(table).insert(batch).execute()
+
+                if response.data:
+                    success_count += len(batch)
+                    break
+                else:
+                    raise Exception("Empty response from Supabase")
+
+            except Exception as e:
+                print(f"⚠ [{table}] Batch {i} retry {attempt + 1} failed:", e)
+                time.sleep(2)
+
+    return success_count
+
+if __name__ == "__main__":
+    # --- Load deliveries ---
+    if os.path.exists(DELIVERIES_PARQUET):
+        deliveries_df = pd.read_parquet(DELIVERIES_PARQUET, engine="pyarrow")
+        deliveries_df = clean_df(deliveries_df)
+        # Insert into Supabase table
+        inserted = insert_batches(deliveries_df, "deliveries")
+        print(f"✅ Deliveries loaded ({inserted}/{len(deliveries_df)} rows).")
+    else:
+        print(f"❌ Parquet not found: {DELIVERIES_PARQUET}, skipping deliveries")
+
+    # --- Load traffic routes ---
+    if os.path.exists(TRAFFIC_PARQUET):
+        traffic_df = pd.read_parquet(TRAFFIC_PARQUET, engine="pyarrow")
+        traffic_df = clean_df(traffic_df)
+        inserted = insert_batches(traffic_df, "traffic_routes")
+        print(f"✅ Traffic routes loaded ({inserted}/{len(traffic_df)} rows).")
+    else:
+        print(f"❌ Parquet not found: {TRAFFIC_PARQUET}, skipping traffic_routes")
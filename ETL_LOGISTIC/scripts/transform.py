@@ -3,6 +3,8 @@
 Transform module for SwiftShip Express ETL pipeline (mock-safe)
 """
 
+import numpy as np
+import orjson
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
@@ -15,11 +17,15 @@ STAGED_DIR.mkdir(parents=True, exist_ok=True)
 DELIVERIES_RAW = RAW_DIR / "deliveries_raw_20251211T083053Z.json"
 TRAFFIC_RAW = RAW_DIR / "traffic_routes_raw_20251211T083053Z.json"
 
-TRANSFORMED_CSV = STAGED_DIR / "air_quality_transformed_mock.csv"
+TRANSFORMED_PARQUET = STAGED_DIR / "air_quality_transformed_mock.parquet"
 
 # --- Load raw JSON ---
-deliveries_df = pd.read_json(DELIVERIES_RAW)
-traffic_df = pd.read_json(TRAFFIC_RAW)
+def read_records(path: Path) -> pd.DataFrame:
+    with open(path, "rb") as f:
+        return pd.DataFrame.from_records(orjson.loads(f.read()))
+
+deliveries_df = read_records(DELIVERIES_RAW)
+traffic_df = read_records(TRAFFIC_RAW)
 
 # --- Ensure traffic_df has required columns ---
 if "source_city" not in traffic_df.columns:
@@ -34,70 +40,73 @@ if "weather_warnings" not in traffic_df.columns:
     traffic_df["weather_warnings"] = None
 
 # --- Clean deliveries data ---
-deliveries_df["dispatch_time"] = pd.to_datetime(deliveries_df["dispatch_time"], errors='coerce')
-deliveries_df["expected_delivery_time"] = pd.to_datetime(deliveries_df["expected_delivery_time"], errors='coerce')
-deliveries_df["actual_delivery_time"] = pd.to_datetime(deliveries_df["actual_delivery_time"], errors='coerce')
-
-# Remove invalid rows
-deliveries_df = deliveries_df.dropna(subset=["dispatch_time", "expected_delivery_time", "actual_delivery_time"])
-deliveries_df = deliveries_df[deliveries_df["actual_delivery_time"] >= deliveries_df["expected_delivery_time"]]
+# Explicit ISO8601 format skips the per-value dateutil fallback
+dispatch_dt = pd.to_datetime(deliveries_df["dispatch_time"], errors='coerce', cache=True, format='ISO8601')
+expected_dt = pd.to_datetime(deliveries_df["expected_delivery_time"], errors='coerce', cache=True, format='ISO8601')
+actual_dt = pd.to_datetime(deliveries_df["actual_delivery_time"], errors='coerce', cache=True, format='ISO8601')
+
+# Remove invalid rows (unparseable timestamps or delivered before expected) in one pass
+valid = dispatch_dt.notna() & expected_dt.notna() & actual_dt.notna() & (actual_dt >= expected_dt)
+deliveries_df = deliveries_df.loc[valid].assign(
+    dispatch_time=dispatch_dt[valid],
+    expected_delivery_time=expected_dt[valid],
+    actual_delivery_time=actual_dt[valid]
+)
 
 # Convert weight to kg if needed
 if deliveries_df["package_weight"].max() > 1000:
     deliveries_df["package_weight"] = deliveries_df["package_weight"] / 1000
 
 # --- Compute delay ---
-deliveries_df["delay_minutes"] = (deliveries_df["actual_delivery_time"] - deliveries_df["expected_delivery_time"]).dt.total_seconds() / 60
+actual = deliveries_df["actual_delivery_time"].values
+expected = deliveries_df["expected_delivery_time"].values
+deliveries_df["delay_minutes"] = (actual - expected) / np.timedelta64(1, "m")
 
 # --- Delay classification ---
-def classify_delay(x):
-    if x <= 0:
-        return "On-Time"
-    elif x <= 60:
-        return "Slight Delay"
-    elif x <= 180:
-        return "Major Delay"
-    else:
-        return "Critical Delay"
-
-deliveries_df["delay_class"] = deliveries_df["delay_minutes"].apply(classify_delay)
+dm = deliveries_df["delay_minutes"].values
+deliveries_df["delay_class"] = np.select(
+    [dm <= 0, dm <= 60, dm <= 180],
+    ["On-Time", "Slight Delay", "Major Delay"],
+    default="Critical Delay"
+)
 
 # --- Agent performance score ---
-def agent_score(x):
-    if x <= 0:
-        return 5
-    elif x <= 30:
-        return 4
-    elif x <= 60:
-        return 3
-    elif x <= 180:
-        return 2
-    else:
-        return 1
-
-deliveries_df["agent_score"] = deliveries_df["delay_minutes"].apply(agent_score)
+deliveries_df["agent_score"] = np.select(
+    [dm <= 0, dm <= 30, dm <= 60, dm <= 180],
+    [5, 4, 3, 2],
+    default=1
+)
 
 # --- Merge with traffic data ---
-merged_df = deliveries_df.merge(
-    traffic_df[["source_city", "destination_city", "congestion_score", "avg_route_speed", "weather_warnings"]],
-    on=["source_city", "destination_city"],
-    how="left"
-)
+route_keys = ["source_city", "destination_city"]
 
-# --- Feature engineering ---
-merged_df["traffic_impact_score"] = merged_df["congestion_score"] * (1 / merged_df["avg_route_speed"]) * 10
+# Shared categories on both sides → the join compares integer codes
+city_dtype = pd.CategoricalDtype(
+    pd.unique(pd.concat([df[k] for df in (deliveries_df, traffic_df) for k in route_keys]).dropna())
+)
+for df in (deliveries_df, traffic_df):
+    for k in route_keys:
+        df[k] = df[k].astype(city_dtype)
 
-def risk_level(x):
-    if x > 15:
-        return "High Risk"
-    elif x > 7:
-        return "Moderate Risk"
-    else:
-        return "Low Risk"
+# traffic_df is one row per route → index it once and look routes up
+traffic_idx = traffic_df[route_keys + ["congestion_score", "avg_route_speed", "weather_warnings"]].set_index(route_keys)
+merged_df = deliveries_df.join(traffic_idx, on=route_keys, how="left").reset_index(drop=True)
 
-merged_df["predicted_delay_risk_level"] = merged_df["traffic_impact_score"].apply(risk_level)
+# --- Feature engineering ---
+cs = merged_df["congestion_score"].values
+sp = merged_df["avg_route_speed"].values
+# avg_route_speed of 0 → inf/NaN as before, without the RuntimeWarning
+with np.errstate(divide="ignore", invalid="ignore"):
+    merged_df["traffic_impact_score"] = cs * 10.0 / sp
+
+tis = merged_df["traffic_impact_score"].values
+merged_df["predicted_delay_risk_level"] = np.select(
+    [tis > 15, tis > 7],
+    ["High Risk", "Moderate Risk"],
+    default="Low Risk"
+)
 merged_df["delivery_efficiency_index"] = (merged_df["package_weight"] / (merged_df["delay_minutes"] + 1)) * merged_df["agent_score"]
 
-# --- Save transformed CSV ---
-merged_df.to_csv(TRANSFORMED_CSV, index=False)
-print(f"✅ Transformed data saved to {TRANSFORMED_CSV}")
+# --- Save transformed Parquet ---
+merged_df.to_parquet(TRANSFORMED_PARQUET, engine="pyarrow", compression="snappy", index=False)
+print(f"✅ Transformed data saved to {TRANSFORMED_PARQUET}")
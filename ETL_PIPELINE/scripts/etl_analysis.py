@@ -1,18 +1,9 @@
 import os
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # file output only — skip GUI backend import
 import matplotlib.pyplot as plt
-from supabase import create_client
-from dotenv import load_dotenv
-
-# -----------------------------
-# CONNECT TO SUPABASE
-# -----------------------------
-def get_supabase_client():
-    load_dotenv()
-    return create_client(
-        os.getenv("SUPABASE_URL"),
-        os.getenv("SUPABASE_KEY")
-    )
+from supabase_client import get_supabase_client
 
 # -----------------------------
 # MAIN ANALYSIS FUNCTION
@@ -22,11 +13,20 @@ def run_etl_analysis():
 
     supabase = get_supABASE_client = get_supabase_client()
 
-    response = supabase.table("telco_churn").select("*").execute()
+    # ✅ Only the columns the metrics and plots below actually use
+    columns = (
+        "churn,contract,monthlycharges,totalcharges,"
+        "tenure_group,internetservice,monthly_charge_segment"
+    )
+    response = supabase.table("telco_churn").select(columns).execute()
     df = pd.DataFrame(response.data)
 
     print(f"✅ Retrieved {len(df)} records")
 
+    # ✅ Categorical dtypes → groupby hashes integer codes, not strings
+    for col in ["churn", "tenure_group", "monthly_charge_segment"]:
+        df[col] = df[col].astype("category")
+
     # -----------------------------
     # 📊 METRICS
     # -----------------------------
@@ -44,13 +44,10 @@ def run_etl_analysis():
     internet_dist = df["internetservice"].value_counts()
 
     ## 5️⃣ Pivot Table: Churn vs Tenure Group
-    churn_tenure_pivot = pd.pivot_table(
-        df,
-        index="tenure_group",
-        columns="churn",
-        values="tenure",
-        aggfunc="count",
-        fill_value=0
+    churn_tenure_pivot = (
+        df.groupby(["tenure_group", "churn"], observed=True)
+        .size()
+        .unstack(fill_value=0)
     )
 
     # -----------------------------
@@ -77,36 +74,38 @@ def run_etl_analysis():
     # -----------------------------
 
     ## 1️⃣ Churn Rate by Monthly Charge Segment
-    churn_segment = df.groupby("monthly_charge_segment")["churn"].value_counts(normalize=True).unstack().fillna(0)
+    churn_counts = (
+        df.groupby(["monthly_charge_segment", "churn"], observed=True)
+        .size()
+        .unstack(fill_value=0)
+    )
+    churn_segment = churn_counts.div(churn_counts.sum(axis=1), axis=0)
+
+    # ✅ One Figure/Axes reused for every chart
+    fig, ax = plt.subplots()
 
-    plt.figure()
-    churn_segment["yes"].plot(kind="bar")
-    plt.title("Churn Rate by Monthly Charge Segment")
-    plt.xlabel("Charge Segment")
-    plt.ylabel("Churn Rate")
-    plt.tight_layout()
-    plt.savefig("data/processed/churn_by_charge_segment.png")
-    plt.close()
+    churn_segment["yes"].plot(kind="bar", ax=ax)
+    ax.set_title("Churn Rate by Monthly Charge Segment")
+    ax.set_xlabel("Charge Segment")
+    ax.set_ylabel("Churn Rate")
+    fig.savefig("data/processed/churn_by_charge_segment.png", bbox_inches="tight")
 
     ## 2️⃣ Histogram of TotalCharges
-    plt.figure()
-    plt.hist(df["totalcharges"], bins=30)
-    plt.title("Distribution of Total Charges")
-    plt.xlabel("Total Charges")
-    plt.ylabel("Frequency")
-    plt.tight_layout()
-    plt.savefig("data/processed/totalcharges_hist.png")
-    plt.close()
+    ax.clear()
+    ax.hist(df["totalcharges"], bins=30)
+    ax.set_title("Distribution of Total Charges")
+    ax.set_xlabel("Total Charges")
+    ax.set_ylabel("Frequency")
+    fig.savefig("data/processed/totalcharges_hist.png", bbox_inches="tight")
 
     ## 3️⃣ Bar Plot of Contract Types
-    plt.figure()
-    df["contract"].value_counts().plot(kind="bar")
-    plt.title("Contract Type Distribution")
-    plt.xlabel("Contract Type")
-    plt.ylabel("Count")
-    plt.tight_layout()
-    plt.savefig("data/processed/contract_distribution.png")
-    plt.close()
+    ax.clear()
+    df["contract"].value_counts().plot(kind="bar", ax=ax)
+    ax.set_title("Contract Type Distribution")
+    ax.set_xlabel("Contract Type")
+    ax.set_ylabel("Count")
+    fig.savefig("data/processed/contract_distribution.png", bbox_inches="tight")
+    plt.close(fig)
 
     print("✅ All visualizations saved in data/processed/")
 
@@ -1,7 +1,7 @@
 import os
 import pandas as pd
 
-def extract_data():
+def extract_data(persist=False):
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     data_dir = os.path.join(base_dir, "data", "raw")
     os.makedirs(data_dir, exist_ok=True)
@@ -15,14 +15,18 @@ def extract_data():
     if not os.path.exists(downloads_path):
         raise FileNotFoundError(f"❌ File not found: {downloads_path}")
 
-    df = pd.read_csv(downloads_path)
+    # ✅ Multi-threaded pyarrow reader; blank TotalCharges cells parse as NaN
+    df = pd.read_csv(downloads_path, engine="pyarrow", na_values=[" ", ""])
 
-    raw_path = os.path.join(data_dir, "telco_raw.csv")
-    df.to_csv(raw_path, index=False)
+    if persist:
+        raw_path = os.path.join(data_dir, "telco_raw.csv")
+        df.to_csv(raw_path, index=False)
+        print("✅ Extraction complete:", raw_path)
+    else:
+        print(f"✅ Extraction complete: {len(df)} rows")
 
-    print("✅ Extraction complete:", raw_path)
-    return raw_path
+    return df
 
 
 if __name__ == "__main__":
-    extract_data()
+    extract_data(persist=True)
@@ -1,8 +1,10 @@
+import io
 import os
 import time
 import pandas as pd
-from supabase import create_client
 from dotenv import load_dotenv
+from postgrest.exceptions import APIError
+from supabase_client import get_supabase_client, is_missing_function
 
 # ----------------------------------------
 # Batch Generator
@@ -11,18 +13,78 @@ def chunk_data(data, size=200):
     for i in range(0, len(data), size):
         yield data[i:i + size]
 
+# ----------------------------------------
+# NaN → None (Postgres compatible)
+# ----------------------------------------
+def clean_df(df):
+    # ✅ Cast to object first: category/float columns keep NaN under a plain where()
+    return df.astype(object).where(pd.notnull(df), None)
+
+# ----------------------------------------
+# Record Batches (REST path)
+# ----------------------------------------
+def iter_batches(df, size=200):
+    # ✅ Plain tuples + one shared key list; dicts are built one batch at a time
+    cols = df.columns.tolist()
+    rows = list(df.itertuples(index=False, name=None))
+    for batch_rows in chunk_data(rows, size):
+        yield [dict(zip(cols, row)) for row in batch_rows]
+
+# ----------------------------------------
+# Bulk COPY (direct Postgres connection)
+# ----------------------------------------
+def copy_data(df, dsn, table="telco_churn", truncate=True):
+    # ✅ Lazy import: the REST-only path must not require psycopg2
+    import psycopg2
+
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep="\\N")
+    buf.seek(0)
+
+    columns = ", ".join(df.columns)
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn, conn.cursor() as cur:
+            # ✅ TRUNCATE + COPY commit together — no window with an empty table
+            if truncate:
+                cur.execute(f"TRUNCATE {table}")
+            cur.copy_expert(
+                f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buf
+            )
+    finally:
+        conn.close()
+
+    return len(df)
+
+# ----------------------------------------
+# Clear Table (REST path)
+# ----------------------------------------
+def clear_table(supabase):
+    # ✅ TRUNCATE via RPC (see ETL_PIPELINE/sql/truncate_telco_churn.sql)
+    try:
+        supabase.rpc("truncate_telco_churn").execute()
+    except APIError as e:
+        if not is_missing_function(e):
+            raise
+        # ✅ Function not installed → fall back to a full-table DELETE
+        print("⚠ truncate_telco_churn() not found, deleting rows instead "
+              "(apply ETL_PIPELINE/sql/truncate_telco_churn.sql to speed this up)")
+        supabase.table("telco_churn").delete().neq("contract_type_code", -1).execute()
+
 # ----------------------------------------
 # Load Function
 # ----------------------------------------
-def load_data(transformed_path):
+def load_data(data):
     load_dotenv()
 
-    supabase = create_client(
-        os.getenv("SUPABASE_URL"),
-        os.getenv("SUPABASE_KEY")
-    )
+    supabase = get_supabase_client()
 
-    df = pd.read_csv(transformed_path)
+    # ✅ Accept the transformed DataFrame directly, or a staged Parquet path
+    if isinstance(data, pd.DataFrame):
+        df = data.copy()
+    else:
+        df = pd.read_parquet(data, engine="pyarrow")
     df.columns = df.columns.str.lower()
 
     required_cols = [
@@ -37,19 +99,28 @@ def load_data(transformed_path):
     df = df[required_cols]
 
     # ✅ Convert NaN → None (Postgres compatible)
-    df = df.where(pd.notnull(df), None)
-
-    records = df.to_dict("records")
-
-    print(f"\n⬆ Uploading {len(records)} rows to Supabase...\n")
-
-    # ✅ OPTIONAL: Clear table before fresh load (prevents duplicates)
-    supabase.table("telco_churn").delete().neq("contract_type_code", -1).execute()
+    df = clean_df(df)
+
+    print(f"\n⬆ Uploading {len(df)} rows to Supabase...\n")
+
+    # ✅ Fast path: TRUNCATE + single COPY over a direct Postgres connection
+    db_url = os.getenv("SUPABASE_DB_URL")
+    if db_url:
+        try:
+            success_count = copy_data(df, db_url)
+            print(f"\n🎯 LOAD COMPLETE — {success_count} rows copied successfully\n")
+            return
+        except Exception as e:
+            # ✅ Missing psycopg2 or a failed COPY (rolled back) → REST inserts
+            print(f"⚠ COPY failed, falling back to REST inserts: {e}")
+
+    # ✅ Clear table before fresh load (prevents duplicates)
+    clear_table(supabase)
     print("🧹 Old records cleared\n")
 
     success_count = 0
 
-    for i, batch in enumerate(chunk_data(records), start=1):
+    for i, batch in enumerate(iter_batches(df), start=1):
         for attempt in range(3):
             try:
                 response = supabase.table("telco_churn").insert(batch).execute()
@@ -71,9 +142,19 @@ def load_data(transformed_path):
 # MAIN PIPELINE
 # ----------------------------------------
 if __name__ == "__main__":
+    import argparse
     from extract import extract_data
     from transform import transform_data
 
-    raw = extract_data()
-    staged = transform_data(raw)
-    load_data(staged)
+    parser = argparse.ArgumentParser(description="Run the Telco churn ETL pipeline")
+    parser.add_argument(
+        "--persist",
+        action="store_true",
+        help="also write the raw CSV under data/raw/"
+    )
+    args = parser.parse_args()
+
+    df = extract_data(persist=args.persist)
+    # ✅ Staged Parquet is always written — validate.py compares against it
+    df = transform_data(df, persist=True)
+    load_data(df)
@@ -0,0 +1,49 @@
+import os
+from functools import lru_cache
+import httpx
+from postgrest.exceptions import APIError
+from supabase import create_client
+from dotenv import load_dotenv
+
+try:
+    from supabase import ClientOptions
+except ImportError:  # early supabase-py 2.x only exposes it under lib/
+    from supabase.lib.client_options import ClientOptions
+
+# PostgREST / Postgres codes for "function does not exist"
+MISSING_FUNCTION_CODES = {"PGRST202", "42883"}
+
+# ----------------------------------------
+# Shared, connection-pooled Supabase client
+# ----------------------------------------
+POOL_LIMITS = httpx.Limits(max_keepalive_connections=16, max_connections=32)
+
+def pooled_http_client():
+    # HTTP/2 needs h2 (pip install "httpx[http2]"); without it keep an HTTP/1.1 pool
+    try:
+        return httpx.Client(limits=POOL_LIMITS, http2=True)
+    except ImportError:
+        return httpx.Client(limits=POOL_LIMITS)
+
+@lru_cache(maxsize=1)
+def get_supabase_client():
+    load_dotenv()
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+
+    # One keep-alive pool reused by every request in the process.
+    # ClientOptions(httpx_client=...) needs supabase-py >= 2.16; older installs
+    # fall back to the library's default client.
+    try:
+        options = ClientOptions(httpx_client=pooled_http_client())
+    except TypeError:
+        options = ClientOptions()
+
+    return create_client(url, key, options=options)
+
+# ----------------------------------------
+# RPC helpers (SQL functions live in ETL_PIPELINE/sql/)
+# ----------------------------------------
+def is_missing_function(err):
+    """True if an RPC failed because the SQL function is not installed."""
+    return isinstance(err, APIError) and err.code in MISSING_FUNCTION_CODES
@@ -1,14 +1,18 @@
 import os
 import pandas as pd
 
-def transform_data(raw_path):
+def transform_data(data, persist=False):
     print("🔄 Starting transformation...")
 
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     staged_dir = os.path.join(base_dir, "data", "staged")
     os.makedirs(staged_dir, exist_ok=True)
 
-    df = pd.read_csv(raw_path)
+    # ✅ Accept the extracted DataFrame directly, or a raw CSV path
+    if isinstance(data, pd.DataFrame):
+        df = data.copy()
+    else:
+        df = pd.read_csv(data, engine="pyarrow", na_values=[" ", ""])
 
     # ✅ Normalize column names for safety
     df.columns = df.columns.str.strip()
@@ -16,7 +20,6 @@ def transform_data(raw_path):
     # -----------------------------
     # 1️⃣ HANDLE MISSING VALUES
     # -----------------------------
-    df["TotalCharges"] = pd.to_numeric(df["TotalCharges"], errors="coerce")
     df["TotalCharges"] = df["TotalCharges"].fillna(df["TotalCharges"].median())
     df = df.ffill()
 
@@ -24,7 +27,8 @@ def transform_data(raw_path):
     # 2️⃣ STANDARDIZE CATEGORICAL DATA
     # -----------------------------
     cat_cols = df.select_dtypes(include=["object"]).columns
-    df[cat_cols] = df[cat_cols].apply(lambda col: col.str.lower())
+    for col in cat_cols:
+        df[col] = df[col].str.lower().astype("category")
 
     # -----------------------------
     # 3️⃣ FEATURE ENGINEERING
@@ -47,7 +51,7 @@ def transform_data(raw_path):
     )
 
     # ✅ Binary Churn Flag
-    df["churn_flag"] = df["Churn"].apply(lambda x: 1 if x == "yes" else 0)
+    df["churn_flag"] = df["Churn"].eq("yes").astype("int8")
 
     # ✅ Contract Type Encoding (FIXED)
     contract_map = {
@@ -56,18 +60,15 @@ def transform_data(raw_path):
         "two year": 2
     }
 
-    df["contract_type_code"] = df["Contract"].map(contract_map)
-    df["contract_type_code"] = df["contract_type_code"].fillna(0).astype(int)
+    df["contract_type_code"] = (
+        df["Contract"].map(contract_map).astype("float64").fillna(0).astype("int8")
+    )
 
     # ✅ Internet Service Flag
-    df["has_internet_service"] = df["InternetService"].apply(
-        lambda x: 0 if x == "no" else 1
-    )
+    df["has_internet_service"] = df["InternetService"].ne("no").astype("int8")
 
     # ✅ Multi Line Flag
-    df["is_multi_line_user"] = df["MultipleLines"].apply(
-        lambda x: 0 if x == "no" else 1
-    )
+    df["is_multi_line_user"] = df["MultipleLines"].ne("no").astype("int8")
 
     # -----------------------------
     # 4️⃣ DROP UNNECESSARY COLUMNS
@@ -77,11 +78,14 @@ def transform_data(raw_path):
     # -----------------------------
     # 5️⃣ SAVE TRANSFORMED DATA
     # -----------------------------
-    staged_path = os.path.join(staged_dir, "telco_transformed.csv")
-    df.to_csv(staged_path, index=False)
+    if persist:
+        staged_path = os.path.join(staged_dir, "telco_transformed.parquet")
+        df.to_parquet(staged_path, engine="pyarrow", compression="snappy", index=False)
+        print(f"✅ Transformation complete: {staged_path}")
+    else:
+        print(f"✅ Transformation complete: {len(df)} rows")
 
-    print(f"✅ Transformation complete: {staged_path}")
-    return staged_path
+    return df
 
 
 # -----------------------------
@@ -90,5 +94,5 @@ def transform_data(raw_path):
 if __name__ == "__main__":
     from extract import extract_data
 
-    raw_path = extract_data()
-    transform_data(raw_path)
+    df = extract_data()
+    transform_data(df, persist=True)
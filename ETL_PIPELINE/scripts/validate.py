@@ -1,83 +1,82 @@
 import os
 import pandas as pd
-from supabase import create_client
-from dotenv import load_dotenv
-
-def fetch_all_rows(table, supabase, batch_size=1000):
-    all_data = []
-    start = 0
-
-    while True:
-        response = (
-            supabase
-            .table(table)
-            .select("*")
-            .range(start, start + batch_size - 1)
-            .execute()
-        )
-
-        data = response.data
-        if not data:
-            break
-
-        all_data.extend(data)
-        start += batch_size
-
-    return pd.DataFrame(all_data)
+from pathlib import Path
+from postgrest.exceptions import APIError
+from supabase_client import get_supabase_client, is_missing_function
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+STATS_SQL = BASE_DIR / "sql" / "validate_telco_churn.sql"
+
+# ----------------------------------------
+# Server-side aggregates (one row, O(1) transfer)
+# ----------------------------------------
+def fetch_table_stats(supabase):
+    # ✅ Defined in ETL_PIPELINE/sql/validate_telco_churn.sql
+    try:
+        return supabase.rpc("validate_telco_churn").execute().data
+    except APIError as e:
+        if is_missing_function(e):
+            raise RuntimeError(
+                f"validate_telco_churn() is not installed in this database. "
+                f"Apply {STATS_SQL} (e.g. in the Supabase SQL editor) and re-run validate.py."
+            ) from e
+        raise
 
 def validate_data():
     print("\n🔍 STARTING DATA VALIDATION...\n")
 
-    load_dotenv()
+    supabase = get_supabase_client()
 
-    supabase = create_client(
-        os.getenv("SUPABASE_URL"),
-        os.getenv("SUPABASE_KEY")
-    )
+    # ✅ Load Transformed Parquet
+    staged_path = BASE_DIR / "data" / "staged" / "telco_transformed.parquet"
+    if not os.path.exists(staged_path):
+        print(f"❌ Staged file not found: {staged_path}")
+        print("   Run load.py (or transform.py) first to write it.")
+        return
 
-    # ✅ Load Transformed CSV
-    staged_path = os.path.join("data", "staged", "telco_transformed.csv")
-    df_csv = pd.read_csv(staged_path)
+    df_staged = pd.read_parquet(staged_path, engine="pyarrow")
 
-    print(f"📄 Transformed CSV rows: {len(df_csv)}")
+    print(f"📄 Transformed Parquet rows: {len(df_staged)}")
 
-    # ✅ Load FULL Supabase Table (No 1000-row limit)
-    df_db = fetch_all_rows("telco_churn", supabase)
-    print(f"🗄 Supabase table rows: {len(df_db)}\n")
+    # ✅ Aggregate the Supabase table server-side (no full download)
+    try:
+        stats = fetch_table_stats(supabase)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+    print(f"🗄 Supabase table rows: {stats['row_count']}\n")
 
     print("✅ VALIDATION RESULTS")
     print("-" * 45)
 
     # ✅ No missing values check
-    if df_db[["tenure", "monthlycharges", "totalcharges"]].isnull().sum().sum() == 0:
+    if stats["null_tenure"] + stats["null_mc"] + stats["null_tc"] == 0:
         print("✅ No missing values in tenure, MonthlyCharges, TotalCharges")
     else:
         print("❌ Missing values detected!")
 
     # ✅ Unique rows
-    unique_rows = df_db.drop_duplicates().shape[0]
-    print(f"✅ Unique rows in Supabase: {unique_rows}")
+    print(f"✅ Unique rows in Supabase: {stats['unique_rows']}")
 
     # ✅ Row count match
-    if len(df_csv) == len(df_db):
-        print("✅ CSV row count matches Supabase table")
+    if len(df_staged) == stats["row_count"]:
+        print("✅ Staged Parquet row count matches Supabase table")
     else:
-        print(f"❌ Row count mismatch! CSV={len(df_csv)}, Supabase={len(df_db)}")
+        print(f"❌ Row count mismatch! Parquet={len(df_staged)}, Supabase={stats['row_count']}")
 
     # ✅ Segment existence check (FIXED COLUMN NAME)
-    if df_db["tenure_group"].isnull().sum() == 0:
+    if stats["null_tenure_group"] == 0:
         print("✅ tenure_group exists for all records")
     else:
         print("❌ tenure_group has missing values")
 
-    if df_db["monthly_charge_segment"].isnull().sum() == 0:
+    if stats["null_mcs"] == 0:
         print("✅ monthly_charge_segment exists for all records")
     else:
         print("❌ monthly_charge_segment has missing values")
 
     # ✅ Contract code validation
-    valid_codes = {0, 1, 2}
-    invalid_codes = set(df_db["contract_type_code"].unique()) - valid_codes
+    invalid_codes = set(stats["bad_contract_codes"])
 
     if len(invalid_codes) == 0:
         print("✅ Contract codes are valid {0,1,2}")
@@ -0,0 +1,10 @@
+-- Clears telco_churn before a fresh REST load (ETL_PIPELINE/scripts/load.py).
+-- TRUNCATE needs table ownership, so the function runs as its definer.
+-- If it is missing, load.py falls back to a full-table DELETE.
+create or replace function truncate_telco_churn()
+returns void
+language sql
+security definer
+as $$
+  truncate telco_churn;
+$$;
@@ -0,0 +1,26 @@
+-- Server-side aggregates for ETL_PIPELINE/scripts/validate.py.
+-- Returns one JSON row so validation never downloads the whole table.
+create or replace function validate_telco_churn()
+returns json
+language sql
+stable
+as $$
+  select json_build_object(
+    'row_count', count(*),
+    'unique_rows', count(distinct (
+        tenure, monthlycharges, totalcharges, churn, internetservice,
+        contract, paymentmethod, tenure_group, monthly_charge_segment,
+        has_internet_service, is_multi_line_user, contract_type_code)),
+    'null_tenure', count(*) filter (where tenure is null),
+    'null_mc', count(*) filter (where monthlycharges is null),
+    'null_tc', count(*) filter (where totalcharges is null),
+    'null_tenure_group', count(*) filter (where tenure_group is null),
+    'null_mcs', count(*) filter (where monthly_charge_segment is null),
+    'bad_contract_codes', coalesce(
+        array_agg(distinct contract_type_code) filter (
+            where contract_type_code is null
+               or contract_type_code not in (0, 1, 2)),
+        '{}')
+  )
+  from telco_churn
+$$;
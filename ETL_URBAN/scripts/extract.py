@@ -2,19 +2,25 @@
 Extract step for AtmosTrack Air Quality ETL.
 
 - Fetches hourly pollutant data for major Indian cities from Open-Meteo Air Quality API.
-- Implements retry with exponential backoff (default 3 attempts).
+- Fetches cities concurrently on one asyncio event loop over a pooled aiohttp session.
+- Retries transient failures (429/5xx, network errors) with exponential backoff,
+  honouring Retry-After (default 3 retries).
 - Saves each city response as JSON in data/raw/<city>raw<timestamp>.json
+- Caches responses per request URL (lat, lon, pollutants): reuses the last raw file
+  within CACHE_TTL_SECONDS, otherwise revalidates with If-None-Match / If-Modified-Since (304 → reuse file)
 - Reads configuration from .env
 """
 
 import os
-import json
 import time
+import orjson
+import asyncio
 import logging
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
-import requests
+from urllib.parse import quote_plus
+import aiohttp
 from dotenv import load_dotenv
 
 # --------------------------
@@ -43,7 +49,6 @@ logging.basicConfig(
 
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 TIMEOUT = int(os.getenv("TIMEOUT_SECONDS", "10"))
-SLEEP_BETWEEN_CALLS = float(os.getenv("SLEEP_BETWEEN_CALLS", "1"))
 POLLUTANTS = os.getenv("POLLUTANTS", "pm10,pm2_5,carbon_monoxide,nitrogen_dioxide,ozone,sulphur_dioxide,uv_index")
 
 # Supabase (to be used later in load step)
@@ -51,6 +56,15 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
 API_BASE = "https://air-quality-api.open-meteo.com/v1/air-quality"
+# Static part of the query encoded once; only lat/lon are substituted per city
+URL_TEMPLATE = f"{API_BASE}?latitude={{lat}}&longitude={{lon}}&hourly={quote_plus(POLLUTANTS)}"
+MAX_WORKERS = 16  # max concurrent connections
+BACKOFF_FACTOR = 1
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# Open-Meteo data changes hourly → skip re-downloads for repeated runs within the hour
+CACHE_FILE = RAW_DIR / "http_cache.json"
+CACHE_TTL = int(os.getenv("CACHE_TTL_SECONDS", "1800"))
 
 # --------------------------
 # Cities (name, lat, lon)
@@ -89,8 +103,8 @@ def _save_raw(payload: object, city: str) -> str:
     filename = f"{city.replace(' ', '').lower()}_raw{ts}.json"
     path = RAW_DIR / filename
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2, ensure_ascii=False)
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
         logging.info(f"✅ Saved data for {city} -> {path}")
     except Exception as e:
         logging.error(f"Failed to save {city} JSON: {e}")
@@ -100,41 +114,115 @@ def _save_raw(payload: object, city: str) -> str:
     return str(path.resolve())
 
 
-def _fetch_city(city: Dict[str, float]) -> Optional[str]:
-    params = {
-        "latitude": city["lat"],
-        "longitude": city["lon"],
-        "hourly": POLLUTANTS
-    }
+def _load_cache() -> Dict[str, dict]:
+    try:
+        return orjson.loads(CACHE_FILE.read_bytes())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
 
-    attempt = 0
-    while attempt < MAX_RETRIES:
-        attempt += 1
+
+def _save_cache(cache: Dict[str, dict]) -> None:
+    try:
+        CACHE_FILE.write_bytes(orjson.dumps(cache))
+    except OSError as e:
+        logging.warning(f"Could not write HTTP cache: {e}")
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+    # Server-provided Retry-After wins; otherwise exponential backoff (0s, 2s, 4s, ...)
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return 0.0 if attempt == 0 else BACKOFF_FACTOR * (2 ** attempt)
+
+
+async def fetch_city_async(
+    session: aiohttp.ClientSession,
+    city: Dict[str, float],
+    cache: Optional[Dict[str, dict]] = None
+) -> Optional[str]:
+    url = URL_TEMPLATE.format(lat=city["lat"], lon=city["lon"])
+    logging.info(f"Starting extraction for {city['name']}")
+
+    cache = {} if cache is None else cache
+    # Full URL as key: a changed POLLUTANTS list must not reuse a raw file with old columns
+    key = url
+    entry = cache.get(key)
+    if entry and not Path(entry["path"]).exists():
+        entry = None
+
+    if entry and time.time() - entry["fetched_at"] < CACHE_TTL:
+        logging.info(f"♻ Reusing cached data for {city['name']} -> {entry['path']}")
+        return entry["path"]
+
+    # Conditional GET: an unchanged payload comes back as 304 with no body
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    for attempt in range(MAX_RETRIES + 1):
+        retry_after = None
         try:
-            response = requests.get(API_BASE, params=params, timeout=TIMEOUT)
-            response.raise_for_status()
-            payload = response.json()
-            saved_path = _save_raw(payload, city["name"])
-            return saved_path
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and entry:
+                    entry["fetched_at"] = time.time()
+                    logging.info(f"♻ Not modified for {city['name']} -> {entry['path']}")
+                    return entry["path"]
+                if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                    retry_after = response.headers.get("Retry-After")
+                    logging.warning(f"{city['name']}: HTTP {response.status}, retrying")
+                else:
+                    response.raise_for_status()
+                    payload = orjson.loads(await response.read())
+                    # Blocking file write off the event loop so other cities keep streaming
+                    path = await asyncio.to_thread(_save_raw, payload, city["name"])
+                    if path.endswith(".json"):
+                        cache[key] = {
+                            "path": path,
+                            "etag": response.headers.get("ETag"),
+                            "last_modified": response.headers.get("Last-Modified"),
+                            "fetched_at": time.time()
+                        }
+                    return path
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt == MAX_RETRIES:
+                logging.error(f"❌ Failed to fetch data for {city['name']} after {MAX_RETRIES} retries: {e}")
+                return None
+            logging.warning(f"{city['name']}: {e!r}, retrying")
         except Exception as e:
-            wait = 2 ** (attempt - 1)
-            logging.warning(f"⚠ {city['name']} attempt {attempt}/{MAX_RETRIES} failed: {e}. Retrying in {wait}s")
-            time.sleep(wait)
-    logging.error(f"❌ Failed to fetch data for {city['name']} after {MAX_RETRIES} attempts")
+            logging.error(f"❌ Failed to fetch data for {city['name']}: {e}")
+            return None
+        await asyncio.sleep(_retry_delay(attempt, retry_after))
     return None
 
 
-def fetch_all_cities(cities: List[Dict[str, float]] = CITIES) -> List[str]:
+async def fetch_all_cities_async(cities: List[Dict[str, float]]) -> List[str]:
+    # One event loop multiplexes every request; the connector caps open sockets
+    connector = aiohttp.TCPConnector(limit=MAX_WORKERS)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    cache = _load_cache()
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        results = await asyncio.gather(
+            *(fetch_city_async(session, city, cache) for city in cities),
+            return_exceptions=True
+        )
+    _save_cache(cache)
     saved_files = []
-    for city in cities:
-        logging.info(f"Starting extraction for {city['name']}")
-        path = _fetch_city(city)
-        if path:
-            saved_files.append(path)
-        time.sleep(SLEEP_BETWEEN_CALLS)
+    for city, result in zip(cities, results):
+        if isinstance(result, BaseException):
+            logging.error(f"❌ Unexpected error for {city['name']}: {result}")
+        elif result:
+            saved_files.append(result)
     return saved_files
 
 
+def fetch_all_cities(cities: List[Dict[str, float]] = CITIES) -> List[str]:
+    if not cities:
+        return []
+    return asyncio.run(fetch_all_cities_async(cities))
+
+
 # --------------------------
 # CLI RUN
 # --------------------------
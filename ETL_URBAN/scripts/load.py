@@ -1,63 +1,138 @@
 """
 Load step for AtmosTrack Air Quality ETL.
 
-- Reads staged CSV: data/staged/air_quality_transformed.csv
-- Batch inserts records into Supabase (table: air_quality_data)
+- Streams staged Parquet in BATCH_SIZE chunks: data/staged/air_quality_transformed.parquet
+  (a staged .csv given via STAGED_FILE is still accepted)
+- Bulk loads via Postgres COPY when SUPABASE_DB_URL is set (direct/pooled connection)
+- Otherwise batch inserts records into Supabase (table: air_quality_data), batches sent in parallel
 - Converts NaN → None
 - Converts timestamps → ISO strings
 - Retries failed batches (2 retries)
 
 Requires:
     pip install supabase
+    pip install psycopg2-binary   # optional, only for the COPY path
 """
 
+import io
 import os
-import math
+import json
+import httpx
 import pandas as pd
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+try:
+    from supabase import ClientOptions
+except ImportError:  # early supabase-py 2.x only exposes it under lib/
+    from supabase.lib.client_options import ClientOptions
+
 load_dotenv()
 
 # --------------------------
 # CONFIG
 # --------------------------
-STAGED_FILE = Path(os.getenv("STAGED_FILE", "data/staged/air_quality_transformed.csv"))
+STAGED_FILE = Path(os.getenv("STAGED_FILE", "data/staged/air_quality_transformed.parquet"))
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+PG_DSN = os.getenv("SUPABASE_DB_URL")
 
-BATCH_SIZE = 200
+BATCH_SIZE = int(os.getenv("LOAD_BATCH_SIZE", "1000"))
+MAX_PAYLOAD_BYTES = 900_000  # stay under PostgREST's ~1MB request body cap
 RETRY_LIMIT = 2
+MAX_CONN = int(os.getenv("SUPABASE_MAX_CONN", "8"))  # keep below Supabase's client-connection cap
+MAX_WORKERS = MAX_CONN  # one in-flight insert per pooled connection
 
 # --------------------------
 # CONNECT
 # --------------------------
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Bounded keep-alive pool: TLS sessions are reused across all batch inserts
+http_client = httpx.Client(
+    timeout=30,
+    limits=httpx.Limits(
+        max_connections=MAX_CONN,
+        max_keepalive_connections=MAX_CONN,
+        keepalive_expiry=30.0
+    )
+)
+# ClientOptions(httpx_client=...) needs supabase-py >= 2.16; older installs use the default client
+try:
+    options = ClientOptions(postgrest_client_timeout=30, httpx_client=http_client)
+except TypeError:
+    options = ClientOptions(postgrest_client_timeout=30)
+supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
 
 # --------------------------
-# LOAD CSV
+# READ STAGED FILE (chunked)
 # --------------------------
-print(f"Reading staged CSV → {STAGED_FILE}")
-
-df = pd.read_csv(STAGED_FILE)
+def prepare_chunk(chunk):
+    """NaN → None and time → ISO string for one chunk."""
+    ts = chunk["time"]
+    chunk = chunk.astype(object).where(pd.notnull(chunk), None)
+    chunk["time"] = ts.dt.strftime("%Y-%m-%dT%H:%M:%S").astype(object).where(ts.notna(), None)
+    return chunk
+
+def iter_chunks(path=STAGED_FILE, chunksize=BATCH_SIZE):
+    """Yield prepared chunks; peak memory stays at about one chunk."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        # Typed columns: time is already datetime64, no re-parsing
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield prepare_chunk(batch.to_pandas())
+        return
+
+    reader = pd.read_csv(path, chunksize=chunksize)
+    for chunk in reader:
+        # Single parse; bad timestamps coerce to NaT
+        chunk["time"] = pd.to_datetime(chunk["time"], errors="coerce")
+        yield prepare_chunk(chunk)
 
-# Replace NaN → None
-df = df.where(pd.notnull(df), None)
+# --------------------------
+# BULK COPY (direct Postgres connection)
+# --------------------------
+def copy_rows(chunks, dsn, table="air_quality_data"):
+    """Stream every chunk into Postgres with COPY ... FROM STDIN inside one transaction."""
+    # Lazy import: the REST-only path must not require psycopg2 (ImportError → REST fallback)
+    import psycopg2
 
-# Convert datetime
-def fix_time(val):
+    total = 0
+    conn = psycopg2.connect(dsn)
     try:
-        return pd.to_datetime(val).isoformat()
-    except:
-        return None
+        with conn, conn.cursor() as cur:
+            for chunk in chunks:
+                buf = io.StringIO()
+                chunk.to_csv(buf, index=False, header=False, na_rep="\\N")
+                buf.seek(0)
+                columns = ", ".join(chunk.columns)
+                cur.copy_expert(
+                    f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                    buf
+                )
+                total += len(chunk)
+    finally:
+        conn.close()
+
+    return total
 
-df["time"] = df["time"].apply(fix_time)
-
-records = df.to_dict(orient="records")
-total_rows = len(records)
-print(f"Total rows to insert: {total_rows}")
+# --------------------------
+# BATCHING
+# --------------------------
+def make_batches(records, batch_size=BATCH_SIZE):
+    """Slice records into batches, halving any batch whose JSON exceeds MAX_PAYLOAD_BYTES."""
+    pending = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+    batches = []
+    while pending:
+        batch = pending.pop(0)
+        if len(batch) > 1 and len(json.dumps(batch, default=str)) > MAX_PAYLOAD_BYTES:
+            mid = len(batch) // 2
+            pending[:0] = [batch[:mid], batch[mid:]]
+        else:
+            batches.append(batch)
+    return batches
 
 # --------------------------
 # BATCH INSERT
@@ -76,29 +151,71 @@ def insert_batch(batch):
                 print("❌ Giving up on this batch.")
                 return False
 
+def insert_chunks(chunks):
+    """Insert chunks as they are parsed, with at most 2×MAX_WORKERS batches in flight."""
+    success_count = 0
+    fail_count = 0
+    in_flight = {}
+
+    def collect(done):
+        nonlocal success_count, fail_count
+        for future in done:
+            rows = in_flight.pop(future)
+            if future.result():
+                success_count += rows
+            else:
+                fail_count += rows
+
+    # Independent batches → overlap the HTTPS round-trips with parsing
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for chunk in chunks:
+            for batch in make_batches(chunk.to_dict(orient="records")):
+                if len(in_flight) >= 2 * MAX_WORKERS:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight[executor.submit(insert_batch, batch)] = len(batch)
+        collect(wait(in_flight).done)
+
+    return success_count, fail_count
+
 # --------------------------
-# PROCESS BATCHES
+# PROCESS CHUNKS
 # --------------------------
-batches = math.ceil(total_rows / BATCH_SIZE)
-success_count = 0
-fail_count = 0
+def run_load(path=STAGED_FILE, batch_size=BATCH_SIZE):
+    """Load the staged file into Supabase; returns (success_count, fail_count)."""
+    if not Path(path).exists():
+        print(f"❌ Staged file not found: {path}")
+        return 0, 0
 
-for i in range(batches):
-    start = i * BATCH_SIZE
-    end = start + BATCH_SIZE
-    batch_data = records[start:end]
+    print(f"Streaming staged data → {path} ({batch_size} rows per chunk)")
 
-    print(f"📦 Inserting batch {i+1}/{batches} ({len(batch_data)} rows)")
+    success_count = 0
+    fail_count = 0
+    copied = False
 
-    if insert_batch(batch_data):
-        success_count += len(batch_data)
-    else:
-        fail_count += len(batch_data)
+    # Fast path: one COPY replaces every REST round-trip (rolled back as a whole on error)
+    if PG_DSN:
+        try:
+            success_count = copy_rows(iter_chunks(path, batch_size), PG_DSN)
+            copied = True
+            print(f"🚚 COPY loaded {success_count} rows")
+        except Exception as e:
+            print(f"⚠ COPY failed, falling back to REST inserts: {e}")
 
-# --------------------------
-# SUMMARY
-# --------------------------
-print("\n================ LOAD SUMMARY ================")
-print(f"✔ Successfully inserted: {success_count} rows")
-print(f"❌ Failed rows: {fail_count}")
-print("==============================================")
+    if not copied:
+        print(f"📦 Inserting batches ({MAX_WORKERS} in parallel)")
+        success_count, fail_count = insert_chunks(iter_chunks(path, batch_size))
+
+    # --------------------------
+    # SUMMARY
+    # --------------------------
+    print("\n================ LOAD SUMMARY ================")
+    print(f"✔ Successfully inserted: {success_count} rows")
+    print(f"❌ Failed rows: {fail_count}")
+    print("==============================================")
+
+    return success_count, fail_count
+
+
+if __name__ == "__main__":
+    run_load()
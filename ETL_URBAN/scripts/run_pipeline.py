@@ -5,8 +5,8 @@ Combined runner for AtmosTrack Air Quality ETL.
 
 Steps:
 1. Extract raw data from Open-Meteo
-2. Transform raw JSON to staged CSV
-3. Load staged CSV to Supabase
+2. Transform raw JSON to staged Parquet
+3. Load staged Parquet to Supabase
 4. Run analysis on loaded data
 
 Usage:
@@ -37,57 +37,12 @@ sys.path.append(str(CURRENT_DIR))
 try:
     from extract import fetch_all_cities
     from transform import run_transform
-    from load import insert_batch, BATCH_SIZE, STAGED_FILE, supabase
-    import pandas as pd
-    import math
-    import etl_analysis
+    from load import run_load
+    from etl_analysis import run_analysis
 except ModuleNotFoundError as e:
     logging.error(f"Failed to import module: {e}")
     sys.exit(1)
 
-# --------------------------
-# Load Step Helper
-# --------------------------
-def run_load():
-    """Load staged CSV into Supabase table in batches."""
-    if not Path(STAGED_FILE).exists():
-        logging.error(f"Staged CSV not found: {STAGED_FILE}")
-        return
-
-    df = pd.read_csv(STAGED_FILE)
-    df = df.where(pd.notnull(df), None)
-
-    # Convert datetime to ISO string
-    df["time"] = pd.to_datetime(df["time"], errors="coerce").apply(lambda x: x.isoformat() if pd.notnull(x) else None)
-    records = df.to_dict(orient="records")
-    total_rows = len(records)
-    logging.info(f"Total rows to insert: {total_rows}")
-
-    success_count = 0
-    fail_count = 0
-    batches = math.ceil(total_rows / BATCH_SIZE)
-
-    for i in range(batches):
-        start = i * BATCH_SIZE
-        end = start + BATCH_SIZE
-        batch_data = records[start:end]
-        attempts = 0
-        inserted = False
-        while attempts <= 2 and not inserted:
-            try:
-                supabase.table("air_quality_data").insert(batch_data).execute()
-                inserted = True
-                success_count += len(batch_data)
-            except Exception as e:
-                attempts += 1
-                logging.warning(f"Batch {i+1} insert attempt {attempts} failed: {e}")
-        if not inserted:
-            fail_count += len(batch_data)
-            logging.error(f"Batch {i+1} failed after retries.")
-
-    logging.info(f"✔ Successfully inserted: {success_count} rows")
-    logging.info(f"❌ Failed rows: {fail_count}")
-
 # --------------------------
 # Main Pipeline Runner
 # --------------------------
@@ -123,8 +78,7 @@ def main():
     # 4) Analysis
     logging.info(">>> Step 4: Running analysis")
     try:
-        # Simply importing etl_analysis runs the analysis
-        import etl_analysis
+        run_analysis()
     except Exception as e:
         logging.error(f"Analysis step failed: {e}")
         sys.exit(1)
@@ -1,18 +1,24 @@
 """
 Transform step for AtmosTrack Air Quality ETL (Open-Meteo Format Fixed).
 
-- Reads all raw JSON files from data/raw/
+- Reads all raw JSON files from data/raw/ (parsed in parallel across processes)
 - Detects city by lat/lon mapping
 - Cleans pollutant arrays (removes trailing nulls)
 - Ensures equal-length arrays
 - Flattens hourly records
-- Adds AQI category, severity, risk, hour
-- Saves to data/staged/air_quality_transformed.csv
+- Adds AQI category, severity, risk, hour (Polars expressions, multi-threaded)
+- Saves to data/staged/air_quality_transformed.parquet (typed, Snappy-compressed)
+
+Requires:
+    pip install polars orjson
 """
 
 import os
-import json
-import pandas as pd
+import mmap
+import orjson
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import polars as pl
 from pathlib import Path
 
 RAW_DIR = Path(__file__).resolve().parents[1] / "data" / "raw"
@@ -30,51 +36,60 @@ CITY_MAP = {
     (22.5726, 88.3639): "Kolkata",
 }
 
+# 0.1° grid → city, covering the ±0.2° match tolerance around each centre
+GRID_STEPS = range(-2, 3)
+CITY_GRID = {}
+for (clat, clon), cname in CITY_MAP.items():
+    for dlat in GRID_STEPS:
+        for dlon in GRID_STEPS:
+            key = (round(clat + dlat / 10, 1), round(clon + dlon / 10, 1))
+            CITY_GRID.setdefault(key, cname)
+
 def detect_city(lat, lon):
-    for (clat, clon), cname in CITY_MAP.items():
-        if abs(clat - lat) < 0.2 and abs(clon - lon) < 0.2:
-            return cname
-    return "Unknown"
+    return CITY_GRID.get((round(lat, 1), round(lon, 1)), "Unknown")
+
+# -----------------------------------
+# Binning helper: right-inclusive bins, null → null, Enum (dictionary) output
+# -----------------------------------
+def bin_labels(values: pl.Expr, edges, labels) -> pl.Expr:
+    expr = pl.when(values <= edges[0]).then(pl.lit(labels[0]))
+    for edge, label in zip(edges[1:], labels[1:]):
+        expr = expr.when(values <= edge).then(pl.lit(label))
+    return expr.when(values.is_not_null()).then(pl.lit(labels[-1])).cast(pl.Enum(labels))
 
 # -----------------------------------
 # AQI Category from PM2.5
 # -----------------------------------
-def compute_aqi(pm25):
-    if pd.isna(pm25):
-        return None
-    if pm25 <= 50:
-        return "Good"
-    elif pm25 <= 100:
-        return "Moderate"
-    elif pm25 <= 200:
-        return "Unhealthy"
-    elif pm25 <= 300:
-        return "Very Unhealthy"
-    else:
-        return "Hazardous"
-
-# -----------------------------------
-# Severity Score
-# -----------------------------------
-def compute_severity(row):
-    return (
-        (row["pm2_5"] * 5)
-        + (row["pm10"] * 3)
-        + (row["nitrogen_dioxide"] * 4)
-        + (row["sulphur_dioxide"] * 4)
-        + (row["carbon_monoxide"] * 2)
-        + (row["ozone"] * 3)
-    )
+AQI_EDGES = [50, 100, 200, 300]
+AQI_LABELS = ["Good", "Moderate", "Unhealthy", "Very Unhealthy", "Hazardous"]
+
+def compute_aqi(pm25: pl.Expr) -> pl.Expr:
+    return bin_labels(pm25, AQI_EDGES, AQI_LABELS)
+
+# -----------------------------------
+# Severity Score (weighted pollutant sum)
+# -----------------------------------
+SEVERITY_WEIGHTS = {
+    "pm2_5": 5,
+    "pm10": 3,
+    "nitrogen_dioxide": 4,
+    "sulphur_dioxide": 4,
+    "carbon_monoxide": 2,
+    "ozone": 3,
+}
+
+def compute_severity() -> pl.Expr:
+    # Plain + chain so a null pollutant gives a null score (sum_horizontal would skip it)
+    return sum(pl.col(col) * w for col, w in SEVERITY_WEIGHTS.items())
 
 # -----------------------------------
 # Risk Flag
 # -----------------------------------
-def compute_risk(sev):
-    if sev > 400:
-        return "High Risk"
-    elif sev > 200:
-        return "Moderate Risk"
-    return "Low Risk"
+RISK_EDGES = [200, 400]
+RISK_LABELS = ["Low Risk", "Moderate Risk", "High Risk"]
+
+def compute_risk(sev: pl.Expr) -> pl.Expr:
+    return bin_labels(sev, RISK_EDGES, RISK_LABELS)
 
 # -----------------------------------
 # Load raw
@@ -88,10 +103,13 @@ def load_raw_files():
 # -----------------------------------
 # Parse a single raw file
 # -----------------------------------
-def parse_raw_json(path: Path):
+def parse_raw_json(path: Path) -> dict:
+    """Return one file's hourly records as column lists ({} if empty)."""
 
-    with open(path, "r") as f:
-        data = json.load(f)
+    # Parse straight from the page cache (orjson takes a memoryview, not the mmap itself)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as buf:
+            data = orjson.loads(buf)
 
     lat = data.get("latitude")
     lon = data.get("longitude")
@@ -101,7 +119,7 @@ def parse_raw_json(path: Path):
     times = hourly.get("time", [])
     if not times:
         print(f"⚠ Empty hourly data in {path.name}")
-        return pd.DataFrame()
+        return {}
 
     # Fix for trailing nulls → trim arrays to match times length
     def trim(arr):
@@ -109,7 +127,7 @@ def parse_raw_json(path: Path):
             return [None] * len(times)
         return (arr + [None] * len(times))[: len(times)]
 
-    df = pd.DataFrame({
+    return {
         "time": times,
         "pm10": trim(hourly.get("pm10")),
         "pm2_5": trim(hourly.get("pm2_5")),
@@ -118,11 +136,8 @@ def parse_raw_json(path: Path):
         "sulphur_dioxide": trim(hourly.get("sulphur_dioxide")),
         "ozone": trim(hourly.get("ozone")),
         "uv_index": trim(hourly.get("uv_index")),
-    })
-
-    df["city"] = city
-
-    return df
+        "city": [city] * len(times),
+    }
 
 # -----------------------------------
 # Main transform
@@ -130,36 +145,49 @@ def parse_raw_json(path: Path):
 def run_transform():
 
     raw_files = load_raw_files()
-    rows = []
-
-    for f in raw_files:
-        print(f"Processing {f.name}")
-        df = parse_raw_json(f)
-        if not df.empty:
-            rows.append(df)
-
-    if not rows:
+    col_lists = defaultdict(list)
+
+    if raw_files:
+        for f in raw_files:
+            print(f"Processing {f.name}")
+        # Files are independent → JSON decode on every core
+        workers = min(os.cpu_count() or 1, len(raw_files))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for cols in executor.map(parse_raw_json, raw_files):
+                for name, values in cols.items():
+                    col_lists[name].extend(values)
+
+    if not col_lists:
         print("❌ No valid data found.")
         return
 
-    df = pd.concat(rows, ignore_index=True)
-
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
-
-    # numeric conversion
+    # One DataFrame build over all files (no per-file frames, no concat);
+    # non-numeric pollutant values coerce to null
     poll_cols = ["pm10","pm2_5","carbon_monoxide","nitrogen_dioxide","sulphur_dioxide","ozone","uv_index"]
-    for col in poll_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    df = df.dropna(subset=poll_cols, how="all")
-
-    df["aqi_category"] = df["pm2_5"].apply(compute_aqi)
-    df["severity_score"] = df.apply(compute_severity, axis=1)
-    df["risk_flag"] = df["severity_score"].apply(compute_risk)
-    df["hour"] = df["time"].dt.hour
+    schema = {"time": pl.String, **dict.fromkeys(poll_cols, pl.Float64), "city": pl.String}
+    df = pl.DataFrame(col_lists, schema=schema, strict=False)
+
+    df = (
+        df.with_columns(pl.col("time").str.to_datetime(time_unit="us", strict=False))
+        .filter(~pl.all_horizontal(pl.col(poll_cols).is_null()))
+        # Each with_columns runs its expressions in parallel
+        .with_columns(
+            aqi_category=compute_aqi(pl.col("pm2_5")),
+            severity_score=compute_severity(),
+            hour=pl.col("time").dt.hour().cast(pl.Int16),
+        )
+        .with_columns(
+            risk_flag=compute_risk(pl.col("severity_score")),
+            # Compact storage: labels become dictionary-encoded categoricals in Parquet.
+            # Pollutants stay Float64 — load.py ships them as-is, and float32 would
+            # need a lossy or per-cell widening step on every chunk
+            city=pl.col("city").cast(pl.Categorical),
+        )
+        .select("time", *poll_cols, "city", "aqi_category", "severity_score", "risk_flag", "hour")
+    )
 
-    out_path = STAGED_DIR / "air_quality_transformed.csv"
-    df.to_csv(out_path, index=False)
+    out_path = STAGED_DIR / "air_quality_transformed.parquet"
+    df.write_parquet(out_path, compression="snappy")
 
     print(f"✅ Transform Saved → {out_path}")
     print(f"Rows: {len(df)}")
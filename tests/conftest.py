@@ -0,0 +1,42 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load_script(project, name):
+    """Import <project>/scripts/<name>.py under a project-unique module name.
+
+    Every ETL project has its own load.py / transform.py, so the scripts are
+    loaded by path instead of through sys.path to keep them apart.
+    """
+    module_name = f"{project.lower()}_{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    scripts_dir = REPO_ROOT / project / "scripts"
+    sys.path.insert(0, str(scripts_dir))  # sibling imports, e.g. supabase_client
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, scripts_dir / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+    finally:
+        sys.path.remove(str(scripts_dir))
+    return module
+
+
+@pytest.fixture
+def load_script(monkeypatch):
+    """Loader for ETL scripts; dummy Supabase credentials satisfy import-time checks."""
+    monkeypatch.setenv("SUPABASE_URL", "http://localhost:54321")
+    # JWT-shaped so older supabase-py key validation accepts it; never sent anywhere
+    monkeypatch.setenv("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.dGVzdA")
+    return _load_script
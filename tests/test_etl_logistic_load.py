@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("supabase")
+
+
+@pytest.fixture
+def load(load_script):
+    return load_script("ETL_LOGISTIC", "load")
+
+
+def test_clean_df_maps_inf_nan_and_timestamps(load):
+    df = pd.DataFrame({
+        "delay_minutes": [1.5, np.inf, -np.inf, np.nan],
+        "route_id": pd.Series(["R1", "R2", None, "R4"], dtype="category"),
+        "expected_time": pd.to_datetime(["2025-01-01T08:30", None, "2025-01-01T09:00", None]),
+    })
+
+    records = load.clean_df(df).to_dict("records")
+
+    assert [r["delay_minutes"] for r in records] == [1.5, None, None, None]
+    assert [r["route_id"] for r in records] == ["R1", "R2", None, "R4"]
+    assert [r["expected_time"] for r in records] == ["2025-01-01T08:30:00", None, "2025-01-01T09:00:00", None]
+
+
+def test_chunk_data_splits_by_size(load):
+    assert [len(b) for b in load.chunk_data(list(range(5)), size=2)] == [2, 2, 1]
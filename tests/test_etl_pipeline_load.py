@@ -0,0 +1,36 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("supabase")
+
+
+@pytest.fixture
+def load(load_script):
+    return load_script("ETL_PIPELINE", "load")
+
+
+def test_clean_df_turns_nan_into_none_for_category_and_float(load):
+    df = pd.DataFrame({
+        "contract": pd.Series(["month-to-month", np.nan], dtype="category"),
+        "totalcharges": pd.Series([29.85, np.nan], dtype="float64"),
+    })
+
+    batches = list(load.iter_batches(load.clean_df(df)))
+
+    assert batches == [[
+        {"contract": "month-to-month", "totalcharges": 29.85},
+        {"contract": None, "totalcharges": None},
+    ]]
+    # REST payload must be strict JSON (no NaN)
+    json.dumps(batches[0], allow_nan=False)
+
+
+def test_iter_batches_splits_by_size(load):
+    df = pd.DataFrame({"tenure": range(5)})
+
+    sizes = [len(b) for b in load.iter_batches(df, size=2)]
+
+    assert sizes == [2, 2, 1]
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("supabase")
+pytest.importorskip("matplotlib")
+
+
+@pytest.fixture
+def analysis(load_script):
+    return load_script("ETL_URBAN", "etl_analysis")
+
+
+def per_row_risk(severity):
+    """The original per-row .apply() rule the vectorized version must match."""
+    sev = severity.dropna()
+    low, med = sev.quantile(0.33), sev.quantile(0.66)
+
+    def label(value):
+        if pd.isna(value):
+            return None
+        if value <= low:
+            return "Low Risk"
+        if value <= med:
+            return "Moderate Risk"
+        return "High Risk"
+
+    return [label(v) for v in severity]
+
+
+@pytest.mark.parametrize("values", [
+    [10.0, 20.0, 30.0, 40.0, 50.0, 60.0, np.nan],
+    [5.0, 5.0, 5.0, 5.0, 9.0],          # tied 33rd/66th percentiles
+    [7.0, 7.0, 7.0],                    # every threshold equal
+    [np.nan, np.nan],                   # no severity at all → NaN thresholds
+])
+def test_dynamic_risk_flags_match_per_row_rule(analysis, values):
+    severity = pd.Series(values, dtype="float64")
+
+    assert list(analysis.dynamic_risk_flags(severity)) == per_row_risk(severity)
+
+
+def test_dynamic_risk_flags_value_counts_has_no_empty_labels(analysis):
+    severity = pd.Series([5.0, 5.0, 5.0, 5.0, 9.0])
+
+    counts = pd.Series(analysis.dynamic_risk_flags(severity)).value_counts()
+
+    assert counts.to_dict() == {"Low Risk": 4, "High Risk": 1}
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("supabase")
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def load(load_script):
+    return load_script("ETL_URBAN", "load")
+
+
+def test_prepare_chunk_maps_missing_values_to_none(load):
+    chunk = pd.DataFrame({
+        "time": pd.to_datetime(["2025-12-11T01:00", None]),
+        "pm2_5": [12.5, np.nan],
+        "city": pd.Series(["Delhi", None], dtype="category"),
+    })
+
+    records = load.prepare_chunk(chunk).to_dict(orient="records")
+
+    assert records == [
+        {"time": "2025-12-11T01:00:00", "pm2_5": 12.5, "city": "Delhi"},
+        {"time": None, "pm2_5": None, "city": None},
+    ]
+
+
+def test_iter_chunks_csv_parses_time_once_and_coerces_bad_values(load, tmp_path):
+    path = tmp_path / "staged.csv"
+    path.write_text("time,pm2_5\n2025-12-11T01:00,1.5\nnot-a-date,2.5\n2025-12-11T03:00,\n")
+
+    chunks = list(load.iter_chunks(path, chunksize=2))
+
+    assert [len(c) for c in chunks] == [2, 1]
+    records = pd.concat(chunks).to_dict(orient="records")
+    assert [r["time"] for r in records] == ["2025-12-11T01:00:00", None, "2025-12-11T03:00:00"]
+    assert [r["pm2_5"] for r in records] == [1.5, 2.5, None]
+
+
+def test_iter_chunks_parquet_streams_batches(load, tmp_path):
+    path = tmp_path / "staged.parquet"
+    pd.DataFrame({
+        "time": pd.date_range("2025-12-11", periods=5, freq="h"),
+        "pm2_5": [1.0, np.nan, 3.0, 4.0, 5.0],
+    }).to_parquet(path, index=False)
+
+    chunks = list(load.iter_chunks(path, chunksize=2))
+
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert chunks[0].to_dict(orient="records")[1] == {"time": "2025-12-11T01:00:00", "pm2_5": None}
+
+
+def test_make_batches_halves_oversized_payloads(load, monkeypatch):
+    records = [{"city": "Delhi", "note": "x" * 100} for _ in range(8)]
+    monkeypatch.setattr(load, "MAX_PAYLOAD_BYTES", 300)
+
+    batches = load.make_batches(records, batch_size=8)
+
+    assert sum(len(b) for b in batches) == 8
+    assert all(len(b) == 2 for b in batches)
+
+
+def test_make_batches_keeps_single_oversized_record(load, monkeypatch):
+    monkeypatch.setattr(load, "MAX_PAYLOAD_BYTES", 10)
+
+    batches = load.make_batches([{"note": "x" * 100}], batch_size=8)
+
+    assert batches == [[{"note": "x" * 100}]]
@@ -0,0 +1,52 @@
+import pytest
+
+pl = pytest.importorskip("polars")
+
+
+@pytest.fixture
+def transform(load_script):
+    return load_script("ETL_URBAN", "transform")
+
+
+def evaluate(expr, **columns):
+    return pl.DataFrame(columns).select(expr.alias("out"))["out"].to_list()
+
+
+def test_compute_aqi_bins_are_right_inclusive_and_keep_nulls(transform):
+    pm25 = [None, 0.0, 50.0, 50.1, 100.0, 200.0, 300.0, 300.1]
+
+    labels = evaluate(transform.compute_aqi(pl.col("pm2_5")), pm2_5=pm25)
+
+    assert labels == [
+        None, "Good", "Good", "Moderate", "Moderate",
+        "Unhealthy", "Very Unhealthy", "Hazardous",
+    ]
+
+
+def test_compute_risk_bins_are_right_inclusive_and_keep_nulls(transform):
+    severity = [None, 200.0, 200.5, 400.0, 400.5]
+
+    labels = evaluate(transform.compute_risk(pl.col("severity_score")), severity_score=severity)
+
+    assert labels == [None, "Low Risk", "Moderate Risk", "Moderate Risk", "High Risk"]
+
+
+def test_compute_severity_is_weighted_sum_and_null_if_any_pollutant_missing(transform):
+    columns = {
+        "pm2_5": [1.0, 1.0],
+        "pm10": [1.0, None],
+        "nitrogen_dioxide": [1.0, 1.0],
+        "sulphur_dioxide": [1.0, 1.0],
+        "carbon_monoxide": [1.0, 1.0],
+        "ozone": [1.0, 1.0],
+    }
+
+    scores = evaluate(transform.compute_severity(), **columns)
+
+    assert scores == [sum(transform.SEVERITY_WEIGHTS.values()), None]
+
+
+def test_detect_city_matches_within_tolerance(transform):
+    assert transform.detect_city(28.7041, 77.1025) == "Delhi"
+    assert transform.detect_city(28.85, 77.0) == "Delhi"
+    assert transform.detect_city(0.0, 0.0) == "Unknown"